@@ -0,0 +1,82 @@
+"""
+Core churn decision rules and response rendering, kept free of web-framework
+dependencies so the module can be compiled with mypyc (see setup.py). When no
+compiled extension is built, this file is imported as plain Python.
+"""
+import math
+from enum import Enum
+
+import orjson
+
+
+# --- Enums for Robustness and Clarity ---
+class RecommendedAction(str, Enum):
+    PROACTIVE_RETENTION = "Proactive_Retention_Offer"
+    MONITOR_ACCOUNT = "Monitor_Account"
+    NO_ACTION = "No_Action_Needed"
+
+class ConfidenceLevel(str, Enum):
+    HIGH = "High"
+    MEDIUM = "Medium"
+    LOW = "Low"
+
+
+Decision = tuple[RecommendedAction, ConfidenceLevel]
+
+
+# --- Centralized Business Logic Configuration ---
+# (threshold, action, confidence) tiers; a score above a threshold earns that tier.
+CHURN_DECISION_TIERS: tuple[tuple[float, RecommendedAction, ConfidenceLevel], ...] = (
+    (0.75, RecommendedAction.PROACTIVE_RETENTION, ConfidenceLevel.HIGH),
+    (0.50, RecommendedAction.MONITOR_ACCOUNT, ConfidenceLevel.MEDIUM),
+)
+_DEFAULT_DECISION: Decision = (RecommendedAction.NO_ACTION, ConfidenceLevel.LOW)
+
+# Most customers score below every threshold, so the rules are evaluated from the
+# lowest tier up: the common No_Action case returns after a single comparison.
+# Each entry is (upper bound, pre-built decision); scores above all bounds get the top tier.
+_ASCENDING_TIERS = sorted(CHURN_DECISION_TIERS, key=lambda tier: tier[0])
+_TIER_DECISIONS: tuple[tuple[float, Decision], ...] = tuple(
+    zip(
+        [threshold for threshold, _, _ in _ASCENDING_TIERS],
+        [_DEFAULT_DECISION] + [(action, confidence) for _, action, confidence in _ASCENDING_TIERS[:-1]],
+    )
+)
+_TOP_DECISION: Decision = (_ASCENDING_TIERS[-1][1], _ASCENDING_TIERS[-1][2])
+
+
+# --- Business Logic for Decisions ---
+def make_churn_decision(probability: float) -> Decision:
+    """
+    Applies business rules to a churn probability score.
+    Returns a tuple of (recommendation, confidence).
+    """
+    for upper_bound, decision in _TIER_DECISIONS:
+        if probability <= upper_bound:
+            return decision
+    # NaN fails every comparison; it must not fall through to the most expensive action.
+    if math.isnan(probability):
+        return _DEFAULT_DECISION
+    return _TOP_DECISION
+
+
+# --- Response Rendering ---
+# The JSON body of a DecisionResponse only varies in customer_id and churn_probability
+# for a given decision, so one template per (action, confidence) pair is built at import.
+# Keys follow DecisionResponse's field order (in main.py); tests/test_decision_core.py pins this.
+_RESPONSE_TEMPLATES: dict[Decision, bytes] = {
+    (action, confidence): (
+        b'{"customer_id":%s,"churn_probability":%s,'
+        + orjson.dumps({"recommended_action": action.value, "confidence_level": confidence.value})[1:]
+    )
+    for action in RecommendedAction
+    for confidence in ConfidenceLevel
+}
+
+
+def render_decision(
+    customer_id: str, churn_probability: float, action: RecommendedAction, confidence: ConfidenceLevel
+) -> bytes:
+    """Encodes a decision as the JSON body of a DecisionResponse."""
+    # orjson.dumps quotes and escapes the id and keeps full float precision for the score.
+    return _RESPONSE_TEMPLATES[(action, confidence)] % (orjson.dumps(customer_id), orjson.dumps(churn_probability))
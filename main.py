@@ -1,30 +1,33 @@
+import asyncio
 import logging
+import math
 import os
+import queue
 import sys
-from enum import Enum
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
-import requests
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import httpx
+from cachetools import TTLCache
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, FiniteFloat
 
-
-# --- Enums for Robustness and Clarity ---
-class RecommendedAction(str, Enum):
-    PROACTIVE_RETENTION = "Proactive_Retention_Offer"
-    MONITOR_ACCOUNT = "Monitor_Account"
-    NO_ACTION = "No_Action_Needed"
-
-class ConfidenceLevel(str, Enum):
-    HIGH = "High"
-    MEDIUM = "Medium"
-    LOW = "Low"
+# The decision rules live in decision_core so they can be compiled with mypyc (see setup.py).
+from decision_core import ConfidenceLevel, RecommendedAction, make_churn_decision, render_decision
 
 
 # --- Pydantic Models for Data Validation ---
 class FeaturePayload(BaseModel):
     """The raw features the platform expects from a client application."""
+    model_config = ConfigDict(extra="ignore")
+
     customer_id: str
-    features: dict = Field(
+    # A concrete value type lets pydantic-core validate values without per-item dynamic dispatch.
+    # NaN and infinity are rejected: they carry no information and cannot be scored meaningfully.
+    features: dict[str, FiniteFloat] = Field(
         ...,
         example={"monthly_charges": 105.50, "tenure_months": 6, "support_tickets_last_30d": 3}
     )
@@ -32,66 +35,332 @@ class FeaturePayload(BaseModel):
 
 class DecisionResponse(BaseModel):
     """The final, actionable response returned to the client."""
+    model_config = ConfigDict(extra="ignore")
+
     customer_id: str
     churn_probability: float
     recommended_action: RecommendedAction
     confidence_level: ConfidenceLevel
 
 
+# Upper bound on customers per batch request, keeping a single request's latency and memory bounded.
+MAX_BATCH_ITEMS = 1024
+
+
+class BatchRequest(BaseModel):
+    """Many customers to score in a single request."""
+    model_config = ConfigDict(extra="ignore")
+
+    items: list[FeaturePayload] = Field(..., max_length=MAX_BATCH_ITEMS)
+
+
+class BatchResponse(BaseModel):
+    """Decisions for a BatchRequest, in the same order as its items."""
+    model_config = ConfigDict(extra="ignore")
+
+    items: list[DecisionResponse]
+
+
 # --- Setup Structured Logging ---
 # In a real-world scenario, this would be JSON formatted for easier parsing.
-logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueues records unformatted, so messages are rendered on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _JSONBody:
+    """An encoded JSON log argument, decoded only if the record is emitted."""
+
+    __slots__ = ("body",)
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def __str__(self) -> str:
+        return self.body.decode()
+
+
+# Request handlers only pay for an in-memory enqueue; stdout writes happen on the listener thread.
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_DeferredQueueHandler(_log_queue)])
+log_listener = QueueListener(_log_queue, _stdout_handler)
+logger = logging.getLogger("decision_engine")
 
 # --- Service Configuration ---
 # In a real deployment, this would come from environment variables for security and flexibility.
-MODEL_SERVING_URL = os.getenv("MODEL_SERVING_URL", "http://localhost:8001/predict/churn")
+# Parsed once at import so every model-serving call reuses the same URL object.
+MODEL_SERVING_URL = httpx.URL(os.getenv("MODEL_SERVING_URL", "http://localhost:8001/predict/churn"))
+# Until a dedicated model server is deployed, scores are simulated in-process.
+SIMULATE_MODEL_SERVER = os.getenv("SIMULATE_MODEL_SERVER", "true").lower() == "true"
+# Latency-bounded micro-batching: a batch is flushed when full or after the wait budget.
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "5"))
+# Batches sent to Model Serving concurrently per worker; further batches wait for a free slot.
+MAX_CONCURRENT_BATCHES = int(os.getenv("MAX_CONCURRENT_BATCHES", "16"))
+# Short-lived cache of full responses for repeated (customer_id, features) payloads,
+# e.g. dashboard refreshes, polling clients and retries.
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "10000"))
+DECISION_CACHE_TTL_SECONDS = float(os.getenv("DECISION_CACHE_TTL_SECONDS", "60"))
 
 
-# --- Initialize FastAPI App ---
-app = FastAPI(
-    title="Decision Engine",
-    description="Translates model scores into actionable business decisions.",
-    version="1.0.0"
-)
+# --- Simulated Model Configuration ---
+# Feature order, fallback values for missing features, and weights of the placeholder heuristic.
+FEATURE_NAMES = ("support_tickets_last_30d", "tenure_months")
+FEATURE_DEFAULTS = (0, 12)
+WEIGHTS = (0.2, 0.01)
+
+
+def build_scorer(feature_names: tuple[str, ...], defaults: tuple[float, ...], weights: tuple[float, ...]):
+    """
+    Generates a straight-line batch scorer specialized to a fixed feature spec.
+    Names, defaults and weights are inlined as constants, so scoring a row is one
+    expression with no loop over features. Call again when the feature spec changes.
+    """
+    terms = " + ".join(
+        f"d.get({name!r}, {float(default)!r}) * {float(weight)!r}"
+        for name, default, weight in zip(feature_names, defaults, weights, strict=True)
+    )
+    source = f"def score_batch(instances):\n    return [{terms} for d in instances]\n"
+    namespace: dict = {}
+    exec(compile(source, "<score_batch>", "exec"), namespace)
+    return namespace["score_batch"]
+
 
-# --- Centralized Business Logic Configuration ---
-CHURN_DECISION_THRESHOLDS = {
-    "high_risk": {"threshold": 0.75, "action": RecommendedAction.PROACTIVE_RETENTION, "confidence": ConfidenceLevel.HIGH},
-    "medium_risk": {"threshold": 0.50, "action": RecommendedAction.MONITOR_ACCOUNT, "confidence": ConfidenceLevel.MEDIUM},
-}
+score_batch = build_scorer(FEATURE_NAMES, FEATURE_DEFAULTS, WEIGHTS)
 
 
-# --- Simulated Model Serving Client ---
-async def get_churn_prediction_from_model_server(customer_id: str, features: dict) -> float:
+# --- Model Serving Client ---
+async def predict_churn_batch(client: httpx.AsyncClient, instances: list[dict]) -> list[float]:
     """
-    Simulates calling a separate, dedicated Model Serving API.
+    Scores a batch of feature dicts with one call to the Model Serving API.
     This decouples the business logic from the ML model execution.
     """
-    # In a real system, this would be an async HTTP call, e.g., using httpx
-    # payload = {"customer_id": customer_id, "features": features}
-    # async with httpx.AsyncClient() as client:
-    #     response = await client.post(MODEL_SERVING_URL, json=payload)
-    #     response.raise_for_status()
-    #     return response.json()["churn_probability"]
-    logging.info(f"Simulating call to Model Serving for customer: {customer_id}")
-    
+    if not SIMULATE_MODEL_SERVER:
+        response = await client.post(MODEL_SERVING_URL, json={"instances": instances})
+        response.raise_for_status()
+        return response.json()["churn_probabilities"]
+
     # For now, we'll use a simple heuristic for the simulation.
     # A real model server would return a score from a loaded model file.
-    return features.get("support_tickets_last_30d", 0) * 0.2 + features.get("tenure_months", 12) * 0.01
+    return score_batch(instances)
+
+
+def _is_valid_score(score) -> bool:
+    """A usable churn score is a finite int or float; bool is an int subclass but not a score."""
+    return isinstance(score, (int, float)) and not isinstance(score, bool) and math.isfinite(score)
+
+
+class Batcher:
+    """
+    Coalesces concurrent prediction requests into batched model-serving calls.
+    Each caller awaits its own future, which is resolved when its batch is scored.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        batch_size: int = BATCH_SIZE,
+        max_wait_ms: float = MAX_BATCH_WAIT_MS,
+        max_concurrent_batches: int = MAX_CONCURRENT_BATCHES,
+    ):
+        if max_concurrent_batches < 1:
+            # A zero-slot semaphore would never let a single batch through.
+            raise ValueError(f"max_concurrent_batches must be at least 1, got {max_concurrent_batches}.")
+        self.client = client
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[tuple[dict, asyncio.Future[float]]] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        # The batch `_run` is still collecting, so `stop()` can release its callers.
+        self._collecting: list[tuple[dict, asyncio.Future[float]]] = []
+        # Bounds the flushes in flight, so collection continues while earlier batches are scored.
+        self._flush_slots = asyncio.Semaphore(max_concurrent_batches)
+        self._flush_tasks: dict[asyncio.Task, list[tuple[dict, asyncio.Future[float]]]] = {}
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # A flush task cancelled before it started never runs its own cleanup, and nothing will
+        # collect the half-built or still-queued requests, so every remaining waiter is cancelled here.
+        # Flush batches are captured first: finished tasks drop out of `_flush_tasks`.
+        pending = [future for batch in self._flush_tasks.values() for _, future in batch]
+        tasks = [*self._flush_tasks, *([self._task] if self._task is not None else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        pending += [future for _, future in self._collecting]
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait()[1])
+        for future in pending:
+            future.cancel()
+        self._flush_tasks.clear()
+        self._collecting = []
+
+    async def submit(self, features: dict) -> float:
+        """Queues one feature dict and waits for its score."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def submit_many(self, instances: list[dict]) -> list[float]:
+        """Queues many feature dicts at once and waits for all of their scores, in order."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in instances]
+        for features, future in zip(instances, futures):
+            self._queue.put_nowait((features, future))
+        return await asyncio.gather(*futures)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._collecting = batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush_slots.acquire()
+            task = asyncio.create_task(self._flush_in_slot(batch))
+            self._flush_tasks[task] = batch
+            self._collecting = []
+            task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        # Runs even for a task cancelled before its first step, so the slot is always returned.
+        self._flush_tasks.pop(task, None)
+        self._flush_slots.release()
+
+    async def _flush_in_slot(self, batch: list[tuple[dict, asyncio.Future[float]]]) -> None:
+        try:
+            await self._flush(batch)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            # Never let one bad batch leave its callers waiting forever.
+            logger.exception("Failed to flush prediction batch")
+            self._fail(batch, e)
 
-# --- Business Logic for Decisions ---
-def make_churn_decision(probability: float) -> tuple[RecommendedAction, ConfidenceLevel]:
+    async def _flush(self, batch: list[tuple[dict, asyncio.Future[float]]]) -> None:
+        try:
+            scores = await predict_churn_batch(self.client, [features for features, _ in batch])
+            # Every waiter needs exactly one score; anything else fails the whole batch.
+            if not isinstance(scores, list):
+                raise ValueError(f"Model Serving returned {type(scores).__name__} instead of a list of scores.")
+            if len(scores) != len(batch):
+                raise ValueError(f"Model Serving returned {len(scores)} scores for a batch of {len(batch)}.")
+            if not all(_is_valid_score(score) for score in scores):
+                raise ValueError("Model Serving returned a score that is not a finite number.")
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        for (_, future), score in zip(batch, scores):
+            # A waiter may have been cancelled (e.g. client disconnect) while the batch was in flight.
+            if not future.done():
+                future.set_result(score)
+
+    @staticmethod
+    def _fail(batch: list[tuple[dict, asyncio.Future[float]]], exc: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+async def get_churn_prediction_from_model_server(batcher: Batcher, customer_id: str, features: dict) -> float:
+    """Gets a churn score for one customer via the shared micro-batcher."""
+    logger.info("Requesting churn prediction for customer: %s", customer_id)
+    return await batcher.submit(features)
+
+
+# --- Application Lifecycle ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Owns the pooled HTTP client and the micro-batcher for the lifetime of the app."""
+    # One keep-alive pool for all requests avoids a TCP/TLS handshake per call.
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(5.0),
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+    )
+    app.state.batcher = Batcher(app.state.http)
+    log_listener.start()
+    app.state.batcher.start()
+    try:
+        yield
+    finally:
+        await app.state.batcher.stop()
+        await app.state.http.aclose()
+        log_listener.stop()
+
+
+# --- Initialize FastAPI App ---
+app = FastAPI(
+    title="Decision Engine",
+    description="Translates model scores into actionable business decisions.",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# --- Decision Cache ---
+# Every TTLCache call is synchronous and runs on the single event loop, so no lock is needed.
+# Lookups and inserts are separated by the await on the batcher, so identical payloads that
+# miss concurrently are simply scored twice; the later insert overwrites with the same body.
+_decision_cache: TTLCache = TTLCache(maxsize=DECISION_CACHE_SIZE, ttl=DECISION_CACHE_TTL_SECONDS)
+
+
+def _decision_cache_key(payload: FeaturePayload) -> tuple:
+    """Builds a hashable cache key for a payload."""
+    return (payload.customer_id, tuple(sorted(payload.features.items())))
+
+
+def clear_decision_caches() -> None:
+    """Drops all cached decisions; call after changing thresholds or the model."""
+    _decision_cache.clear()
+
+# --- Error Handling ---
+@app.exception_handler(httpx.HTTPError)
+async def model_serving_error_handler(request: Request, exc: httpx.HTTPError):
+    """The model server failed or timed out; report it as a bad gateway."""
+    logger.warning("Model Serving call failed: %r", exc)
+    return ORJSONResponse(status_code=502, content={"detail": "Model Serving is unavailable."})
+
+
+def _replace_non_finite(value):
+    """Swaps NaN/infinity for None anywhere in a JSON-compatible structure."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_replace_non_finite(item) for item in value]
+    return value
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
     """
-    Applies business rules to a churn probability score.
-    Returns a tuple of (recommendation, confidence).
+    Same 422 body as FastAPI's default, except that rejected NaN/infinity inputs are echoed
+    as null, which the standard JSON encoder cannot otherwise produce.
     """
-    if probability > CHURN_DECISION_THRESHOLDS["high_risk"]["threshold"]:
-        rule = CHURN_DECISION_THRESHOLDS["high_risk"]
-        return (rule["action"], rule["confidence"])
-    elif probability > CHURN_DECISION_THRESHOLDS["medium_risk"]["threshold"]:
-        rule = CHURN_DECISION_THRESHOLDS["medium_risk"]
-        return (rule["action"], rule["confidence"])
-    return (RecommendedAction.NO_ACTION, ConfidenceLevel.LOW)
+    return JSONResponse(status_code=422, content={"detail": _replace_non_finite(jsonable_encoder(exc.errors()))})
+
+
+@app.exception_handler(Exception)
+async def unhandled_error_handler(request: Request, exc: Exception):
+    """Logs unexpected failures without leaking their details to the client."""
+    logger.exception("Unhandled error in decision engine")
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error in decision engine."})
+
 
 # --- API Endpoints ---
 @app.get("/", include_in_schema=False)
@@ -100,30 +369,78 @@ async def root():
     return {"message": "Decision Engine is running. Navigate to /docs for API documentation."}
 
 
+def _log_decision(body: bytes) -> None:
+    """Records every decision served, fresh or cached."""
+    # This is the first step towards the feedback loop.
+    # In a later phase, this would write to Kafka or a data lake.
+    logger.info("Decision made: %s", _JSONBody(body))
+
+
+def record_decision(payload: FeaturePayload, cache_key: tuple, churn_probability: float) -> bytes:
+    """Turns a prediction score into an encoded decision, then logs and caches it."""
+    # Use the score to make a business decision.
+    action, confidence = make_churn_decision(churn_probability)
+
+    body = render_decision(payload.customer_id, churn_probability, action, confidence)
+    _log_decision(body)
+
+    _decision_cache[cache_key] = body
+    return body
+
+
+async def decide_for_customer(batcher: Batcher, payload: FeaturePayload) -> bytes:
+    """
+    Gets a prediction for one customer and turns it into a decision, using the cache when possible.
+    Returns the decision already encoded as a JSON DecisionResponse.
+    """
+    cache_key = _decision_cache_key(payload)
+    cached = _decision_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Serving cached decision for customer: %s", payload.customer_id)
+        _log_decision(cached)
+        return cached
+
+    # Call the model server to get a prediction score.
+    churn_probability = await get_churn_prediction_from_model_server(
+        batcher, payload.customer_id, payload.features
+    )
+    return record_decision(payload, cache_key, churn_probability)
+
+
+async def decide_for_customers(batcher: Batcher, payloads: list[FeaturePayload]) -> list[bytes]:
+    """Batch counterpart of decide_for_customer: all cache misses are scored with one batcher submission."""
+    cache_keys = [_decision_cache_key(payload) for payload in payloads]
+    cached: list[bytes | None] = [_decision_cache.get(cache_key) for cache_key in cache_keys]
+    misses = [i for i, body in enumerate(cached) if body is None]
+    logger.info("Batch of %d customers: %d cached, %d to score", len(payloads), len(payloads) - len(misses), len(misses))
+
+    scored: dict[int, bytes] = {}
+    if misses:
+        scores = await batcher.submit_many([payloads[i].features for i in misses])
+        for i, churn_probability in zip(misses, scores):
+            scored[i] = record_decision(payloads[i], cache_keys[i], churn_probability)
+
+    bodies: list[bytes] = []
+    for i, body in enumerate(cached):
+        if body is None:
+            bodies.append(scored[i])
+        else:
+            _log_decision(body)
+            bodies.append(body)
+    return bodies
+
 @app.post("/decide/churn/", response_model=DecisionResponse)
-async def decide(payload: FeaturePayload):
+async def decide(payload: FeaturePayload, request: Request):
     """Accepts customer features, gets a prediction, and returns a decision."""
-    try:
-        # Step 1: Call the model server to get a prediction score.
-        # This is the key change to align with the target architecture.
-        churn_probability = await get_churn_prediction_from_model_server(
-            payload.customer_id, payload.features
-        )
-
-        # Step 2: Use the score to make a business decision.
-        action, confidence = make_churn_decision(churn_probability)
-        
-        response = DecisionResponse(
-            customer_id=payload.customer_id,
-            churn_probability=churn_probability,
-            recommended_action=action,
-            confidence_level=confidence
-        )
-
-        # This is the first step towards the feedback loop.
-        # In a later phase, this would write to Kafka or a data lake.
-        logging.info(f"Decision made: {response.model_dump_json()}")
-
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error in decision engine: {e}")
\ No newline at end of file
+    body = await decide_for_customer(request.app.state.batcher, payload)
+    return Response(content=body, media_type="application/json")
+
+
+@app.post("/decide/churn/batch", response_model=BatchResponse)
+async def decide_batch(batch: BatchRequest, request: Request):
+    """
+    Accepts up to MAX_BATCH_ITEMS customers in one request and returns their decisions
+    in the same order, replacing N round-trips with one.
+    """
+    bodies = await decide_for_customers(request.app.state.batcher, batch.items)
+    return Response(content=b'{"items":[' + b",".join(bodies) + b"]}", media_type="application/json")
@@ -0,0 +1,17 @@
+"""
+Optional native build of the decision hot path.
+
+    pip install mypy setuptools
+    python setup.py build_ext --inplace
+
+This compiles decision_core.py with mypyc into an extension module that Python
+imports in preference to the .py file. Without this step, decision_core.py is
+used as plain Python, which is the normal setup for local development.
+"""
+from mypyc.build import mypycify
+from setuptools import setup
+
+setup(
+    py_modules=[],
+    ext_modules=mypycify(["decision_core.py"], opt_level="3"),
+)
@@ -0,0 +1,88 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    main.clear_decision_caches()
+    with TestClient(main.app) as client:
+        yield client
+    main.clear_decision_caches()
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """Records how many feature dicts reach the scorer in each model-serving call."""
+    calls = []
+    predict = main.predict_churn_batch
+
+    async def spy(http, instances):
+        calls.append(len(instances))
+        return await predict(http, instances)
+
+    monkeypatch.setattr(main, "predict_churn_batch", spy)
+    return calls
+
+
+def _customer(customer_id, tickets):
+    return {"customer_id": customer_id, "features": {"support_tickets_last_30d": tickets, "tenure_months": 6}}
+
+
+def test_non_finite_features_are_rejected(client):
+    response = client.post(
+        "/decide/churn/",
+        content='{"customer_id": "c1", "features": {"tenure_months": NaN}}',
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "finite_number"
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        '{"customer_id": 123456789012345678901234567890, "features": {}}',
+        # The "missing" error echoes the whole body, including the oversized feature value.
+        '{"features": {"tenure_months": 123456789012345678901234567890}}',
+    ],
+)
+def test_errors_echoing_oversized_integers_stay_422(client, body):
+    response = client.post("/decide/churn/", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_batch_keeps_request_order_across_cached_and_scored_items(client, scored):
+    cached = client.post("/decide/churn/", json=_customer("b", 1)).json()
+
+    response = client.post("/decide/churn/batch", json={"items": [_customer("a", 4), _customer("b", 1), _customer("c", 0)]})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["customer_id"] for item in items] == ["a", "b", "c"]
+    assert items[1] == cached
+    assert [item["recommended_action"] for item in items] == [
+        "Proactive_Retention_Offer", "No_Action_Needed", "No_Action_Needed",
+    ]
+    # One call for the single request, then only the two uncached batch items.
+    assert sum(scored) == 3
+
+
+def test_repeated_batch_is_served_from_cache(client, scored):
+    body = {"items": [_customer("a", 4), _customer("b", 1)]}
+
+    first = client.post("/decide/churn/batch", json=body)
+    second = client.post("/decide/churn/batch", json=body)
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert sum(scored) == 2
+
+
+def test_batch_over_the_item_limit_is_rejected(client, scored):
+    response = client.post("/decide/churn/batch", json={"items": [_customer("a", 1)] * (main.MAX_BATCH_ITEMS + 1)})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "too_long"
+    assert scored == []
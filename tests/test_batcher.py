@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+
+
+def _run_batcher(monkeypatch, handler, checks):
+    """Runs `checks(batcher)` against a Batcher whose model server is the given MockTransport handler."""
+    monkeypatch.setattr(main, "SIMULATE_MODEL_SERVER", False)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            batcher = main.Batcher(client, batch_size=8, max_wait_ms=5)
+            batcher.start()
+            try:
+                await checks(batcher)
+            finally:
+                await batcher.stop()
+
+    asyncio.run(run())
+
+
+def test_malformed_scores_fail_the_batch_and_keep_the_batcher_running(monkeypatch):
+    responses = iter([{"churn_probabilities": None}, {"churn_probabilities": [0.4]}])
+
+    def handler(request):
+        return httpx.Response(200, json=next(responses))
+
+    async def checks(batcher):
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(batcher.submit({}), timeout=1)
+        assert await asyncio.wait_for(batcher.submit({}), timeout=1) == 0.4
+
+    _run_batcher(monkeypatch, handler, checks)
+
+
+@pytest.mark.parametrize("bad_score", ["NaN", '"0.4"', "true", "null"])
+def test_non_numeric_or_non_finite_scores_fail_the_batch(monkeypatch, bad_score):
+    def handler(request):
+        # Raw body so NaN reaches the client exactly as a model server could send it.
+        return httpx.Response(200, content=f'{{"churn_probabilities": [0.1, {bad_score}]}}')
+
+    async def checks(batcher):
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit({}) for _ in range(2)), return_exceptions=True), timeout=1
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    _run_batcher(monkeypatch, handler, checks)
+
+
+def test_short_score_list_fails_every_waiter(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json={"churn_probabilities": [0.1]})
+
+    async def checks(batcher):
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit({}) for _ in range(3)), return_exceptions=True), timeout=1
+        )
+        assert len(results) == 3
+        assert all(isinstance(result, ValueError) for result in results)
+
+    _run_batcher(monkeypatch, handler, checks)
+
+
+def test_batches_are_scored_concurrently(monkeypatch):
+    inflight = peak = 0
+
+    async def handler(request):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        await asyncio.sleep(0.05)
+        inflight -= 1
+        return httpx.Response(200, json={"churn_probabilities": [0.1] * 8})
+
+    async def checks(batcher):
+        scores = await asyncio.wait_for(batcher.submit_many([{}] * 32), timeout=1)
+        assert scores == [0.1] * 32
+
+    _run_batcher(monkeypatch, handler, checks)
+    assert peak > 1
+
+
+def test_stop_cancels_in_flight_collecting_and_queued_requests(monkeypatch):
+    monkeypatch.setattr(main, "SIMULATE_MODEL_SERVER", False)
+
+    async def handler(request):
+        await asyncio.Event().wait()  # The model server never answers.
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            # One slot and one-item batches: the first request is in flight, the second is held
+            # by `_run` waiting for the slot, and the third is still queued.
+            batcher = main.Batcher(client, batch_size=1, max_wait_ms=5, max_concurrent_batches=1)
+            batcher.start()
+            waiters = [asyncio.ensure_future(batcher.submit({})) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            await batcher.stop()
+            results = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), timeout=1)
+            assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+    asyncio.run(run())
+
+
+def test_rejects_fewer_than_one_concurrent_batch():
+    with pytest.raises(ValueError):
+        main.Batcher(httpx.AsyncClient(), max_concurrent_batches=0)
@@ -0,0 +1,32 @@
+import json
+import math
+
+import pytest
+
+from decision_core import ConfidenceLevel, RecommendedAction, make_churn_decision, render_decision
+from main import DecisionResponse
+
+
+def test_thresholds_are_exclusive():
+    assert make_churn_decision(0.50) == (RecommendedAction.NO_ACTION, ConfidenceLevel.LOW)
+    assert make_churn_decision(0.51) == (RecommendedAction.MONITOR_ACCOUNT, ConfidenceLevel.MEDIUM)
+    assert make_churn_decision(0.75) == (RecommendedAction.MONITOR_ACCOUNT, ConfidenceLevel.MEDIUM)
+    assert make_churn_decision(0.76) == (RecommendedAction.PROACTIVE_RETENTION, ConfidenceLevel.HIGH)
+
+
+def test_nan_score_takes_no_action():
+    assert make_churn_decision(math.nan) == (RecommendedAction.NO_ACTION, ConfidenceLevel.LOW)
+
+
+@pytest.mark.parametrize("confidence", list(ConfidenceLevel))
+@pytest.mark.parametrize("action", list(RecommendedAction))
+def test_rendered_body_matches_decision_response(action, confidence):
+    customer_id = 'cust "42" \\ 100% \u00e9'
+    expected = DecisionResponse(
+        customer_id=customer_id, churn_probability=0.6600000000000001,
+        recommended_action=action, confidence_level=confidence,
+    ).model_dump_json()
+
+    rendered = json.loads(render_decision(customer_id, 0.6600000000000001, action, confidence))
+    # Compare items as lists so key order is pinned too, not just the content.
+    assert list(rendered.items()) == list(json.loads(expected).items())
@@ -1,7 +1,11 @@
 import os
+import time
 
+import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 # --- Configuration ---
 st.set_page_config(
@@ -13,8 +17,70 @@ st.set_page_config(
 # This should point to your running FastAPI application
 # Use an environment variable for the API URL in production
 API_URL = os.getenv("API_URL", "http://localhost:8000/decide/churn/")
+BATCH_API_URL = os.getenv("BATCH_API_URL", API_URL.rstrip("/") + "/batch")
+# Per-request cap of the batch endpoint (MAX_BATCH_ITEMS in main.py); larger uploads are sent in chunks.
+MAX_BATCH_ITEMS = 1024
+
+# Recommended actions returned by the API (see RecommendedAction in decision_core.py)
+PROACTIVE_RETENTION = "Proactive_Retention_Offer"
+MONITOR_ACCOUNT = "Monitor_Account"
+
+# Reuse one HTTP session per browser session so repeat submissions keep the connection alive.
+if "http" not in st.session_state:
+    st.session_state.http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+    st.session_state.http.mount("http://", adapter)
+    st.session_state.http.mount("https://", adapter)
+http = st.session_state.http
+
+# Transient failures (rate limiting, server errors) are retried with exponential backoff.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Shared hosts such as Hugging Face Spaces get a more conservative minimum interval between calls.
+DEFAULT_POLL_INTERVAL_MS = 2000 if "SPACE_ID" in os.environ else 500
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    return (
+        isinstance(exc, requests.HTTPError)
+        and exc.response is not None
+        and exc.response.status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=0.25, max=2),
+    retry=retry_if_exception(_is_retryable),
+    reraise=True,
+)
+def post_json(url: str, payload, timeout: float) -> requests.Response:
+    """POSTs a JSON payload, raising for 4xx/5xx responses."""
+    response = http.post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+
+def request_allowed(min_interval_ms: float) -> bool:
+    """Enforces a minimum interval between API calls from this browser session."""
+    now = time.monotonic()
+    elapsed_ms = (now - st.session_state.get("last_request_at", float("-inf"))) * 1000
+    if elapsed_ms < min_interval_ms:
+        st.warning(f"Please wait {(min_interval_ms - elapsed_ms) / 1000:.1f}s before sending another request.", icon="⏳")
+        return False
+    st.session_state.last_request_at = now
+    return True
+
 
 # --- UI Components ---
+poll_interval_ms = st.sidebar.number_input(
+    "Minimum interval between requests (ms)",
+    min_value=0,
+    max_value=60000,
+    value=DEFAULT_POLL_INTERVAL_MS,
+    step=250,
+)
+
 st.title("🤖 Customer Churn Decision Platform")
 st.markdown(
     """
@@ -42,7 +108,7 @@ with st.form("customer_features_form"):
 
 
 # --- API Call and Response Handling ---
-if submitted:
+if submitted and request_allowed(poll_interval_ms):
     # Construct the payload based on the FeaturePayload model in the API
     payload = {
         "customer_id": customer_id,
@@ -59,8 +125,7 @@ if submitted:
 
     try:
         with st.spinner("Calling Decision Engine..."):
-            response = requests.post(API_URL, json=payload, timeout=5)
-            response.raise_for_status()  # Will raise an exception for 4xx/5xx responses
+            response = post_json(API_URL, payload, timeout=5)  # Will raise an exception for 4xx/5xx responses
             
             data = response.json()
 
@@ -73,9 +138,9 @@ if submitted:
             probability = data.get("churn_probability", 0)
             confidence = data.get("confidence_level", "N/A")
 
-            if "Proactive_Retention" in action:
+            if action == PROACTIVE_RETENTION:
                 st.error(f"**Action:** {action.replace('_', ' ')}", icon="🚨")
-            elif "Monitor_Account" in action:
+            elif action == MONITOR_ACCOUNT:
                 st.warning(f"**Action:** {action.replace('_', ' ')}", icon="⚠️")
             else:
                 st.success(f"**Action:** {action.replace('_', ' ')}", icon="✅")
@@ -84,4 +149,45 @@ if submitted:
 
     except requests.exceptions.RequestException as e:
         st.error(f"API Call Failed: {e}", icon="🔥")
-        st.info("Please ensure the FastAPI server is running. You can start it with: `uvicorn main:app --host 0.0.0.0 --port 8000`")
\ No newline at end of file
+        st.info("Please ensure the FastAPI server is running. You can start it with: `uvicorn main:app --host 0.0.0.0 --port 8000`")
+
+
+# --- Batch Mode ---
+st.header("Batch Mode")
+st.markdown("Upload a CSV with a `customer_id` column and one numeric column per feature to score many customers in one request.")
+
+uploaded_file = st.file_uploader("Customers CSV", type="csv")
+if uploaded_file is not None and st.button("Get Batch Decisions") and request_allowed(poll_interval_ms):
+    customers = pd.read_csv(uploaded_file)
+    if "customer_id" not in customers.columns:
+        st.error("The CSV must contain a `customer_id` column.", icon="🔥")
+        st.stop()
+
+    # The engine only accepts numeric features; one text column would fail its whole chunk.
+    features_only = customers.drop(columns="customer_id")
+    numeric_columns = list(features_only.select_dtypes("number").columns)
+    dropped_columns = [str(column) for column in features_only.columns if column not in numeric_columns]
+    if dropped_columns:
+        st.warning(f"Ignoring non-numeric columns: {', '.join(dropped_columns)}", icon="⚠️")
+    customers = customers[["customer_id", *numeric_columns]]
+
+    batch_payload = []
+    for row in customers.to_dict(orient="records"):
+        customer_id = str(row.pop("customer_id"))
+        # Empty cells are left out so the engine falls back to its feature defaults.
+        features = {name: value for name, value in row.items() if pd.notna(value)}
+        batch_payload.append({"customer_id": customer_id, "features": features})
+
+    try:
+        with st.spinner(f"Calling Decision Engine for {len(batch_payload)} customers..."):
+            results = []
+            for start in range(0, len(batch_payload), MAX_BATCH_ITEMS):
+                chunk = batch_payload[start:start + MAX_BATCH_ITEMS]
+                response = post_json(BATCH_API_URL, {"items": chunk}, timeout=30)
+                results.extend(response.json()["items"])
+
+            st.subheader("Batch Results")
+            st.dataframe(pd.DataFrame(results), use_container_width=True)
+
+    except requests.exceptions.RequestException as e:
+        st.error(f"API Call Failed: {e}", icon="🔥")